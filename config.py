@@ -9,6 +9,9 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 # OpenAI API key for embeddings
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# On-disk FAISS index for conversational Q&A
+VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", "vectorstore")
+
 # Core CSV column names
 KEY_COL = "Issue key"
 SUMMARY_COL = "Summary"
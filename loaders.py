@@ -0,0 +1,20 @@
+from PyPDF2 import PdfReader
+import docx
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+def load_documents(files):
+    texts = []
+    for f in files:
+        if f.type == "application/pdf":
+            reader = PdfReader(f)
+            texts.extend(page.extract_text() for page in reader.pages)
+        elif f.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+            doc = docx.Document(f)
+            texts.append("\n".join(p.text for p in doc.paragraphs))
+        else:  # txt
+            texts.append(f.read().decode("utf-8"))
+    return texts
+
+def chunk_documents(texts, chunk_size=1000, overlap=100):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    return [chunk for text in texts for chunk in splitter.split_text(text)]
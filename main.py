@@ -1,6 +1,7 @@
 import streamlit as st
 from utils import load_documents, chunk_documents, generate_new_rules, load_existing_rules, reconcile_rules, conversational_qa
 from prompts import PHASE1_PROMPT, PHASE2_PROMPT, CHAT_PROMPT
+from vector_index import sync_documents, stale_documents, remove_documents, prune_documents, maybe_compact
 
 def main():
     st.set_page_config(page_title="Regulatory RAG App", layout="wide")
@@ -16,6 +17,31 @@ def main():
     regulatory_files = st.file_uploader("Upload Regulatory Documents (PDF/Word/Txt)", type=["pdf", "docx", "txt"], accept_multiple_files=True)
     existing_rules_file = st.file_uploader("Upload Existing Rules (CSV)", type=["csv"])
 
+    if regulatory_files:
+        with st.spinner("Updating Q&A index..."):
+            added = sync_documents(regulatory_files)
+        st.success(f"Q&A index updated: {len(added)} documents added.")
+
+    # Files still in the uploader would be re-indexed on the next rerun
+    stale = stale_documents(regulatory_files or [])
+    if stale:
+        with st.expander(f"Indexed documents not in the current upload ({len(stale)})"):
+            for doc_hash, entry in stale.items():
+                st.write(f"- {entry['name']} ({doc_hash[:8]})")
+            to_remove = st.multiselect(
+                "Documents to remove from Q&A",
+                options=list(stale),
+                format_func=lambda h: f"{stale[h]['name']} ({h[:8]})",
+            )
+            if to_remove and st.button("Remove selected from index"):
+                removed = remove_documents(to_remove)
+                maybe_compact()
+                st.success(f"Removed {len(removed)} documents from the Q&A index.")
+            if regulatory_files and st.button(f"Remove all {len(stale)} listed documents from index"):
+                removed = prune_documents(regulatory_files)
+                maybe_compact()
+                st.success(f"Removed {len(removed)} documents from the Q&A index.")
+
     new_rules_df = None
     if regulatory_files:
         st.info("Processing regulatory documents...")
@@ -0,0 +1,103 @@
+import importlib.util
+import json
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# ------------------------------
+# In-memory stand-ins for langchain, FAISS and the document parsers
+# ------------------------------
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(t))] for t in texts]
+
+
+class FakeFAISS:
+    # Called with the target folder whenever a compacted base is saved
+    on_save_base = None
+
+    def __init__(self, records):
+        self.records = dict(records)
+        self._reindex()
+
+    def _reindex(self):
+        self.index_to_docstore_id = dict(enumerate(self.records))
+
+    def texts(self):
+        return sorted(r["text"] for r in self.records.values())
+
+    @classmethod
+    def from_embeddings(cls, text_embeddings, embedding, metadatas=None, ids=None):
+        db = cls({})
+        db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        return db
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None):
+        for (text, vector), meta, chunk_id in zip(text_embeddings, metadatas, ids):
+            if chunk_id in self.records:
+                raise ValueError(f"Duplicate id {chunk_id}")
+            self.records[chunk_id] = {"text": text, "vector": vector, "metadata": meta}
+        self._reindex()
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            del self.records[chunk_id]
+        self._reindex()
+
+    def merge_from(self, other):
+        overlap = set(self.records) & set(other.records)
+        if overlap:
+            raise ValueError(f"Duplicate ids {sorted(overlap)}")
+        self.records.update(other.records)
+        self._reindex()
+
+    def save_local(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "index.json"), "w", encoding="utf-8") as fh:
+            json.dump(self.records, fh)
+        hook = FakeFAISS.on_save_base
+        if hook and os.path.basename(folder).startswith("base-"):
+            FakeFAISS.on_save_base = None
+            hook(folder)
+
+    @classmethod
+    def load_local(cls, folder, embeddings):
+        index_path = os.path.join(folder, "index.json")
+        if not os.path.exists(index_path):
+            # faiss.read_index reports a missing file as RuntimeError
+            raise RuntimeError(f"could not open {index_path} for reading")
+        with open(index_path, encoding="utf-8") as fh:
+            return cls(json.load(fh))
+
+
+class FakeSplitter:
+    def __init__(self, chunk_size, chunk_overlap):
+        self.chunk_size = chunk_size
+
+    def split_text(self, text):
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+# Always stub langchain so tests never touch a real FAISS index or the OpenAI API
+_module("langchain")
+_module("langchain.embeddings", OpenAIEmbeddings=FakeEmbeddings)
+_module("langchain.embeddings.openai", OpenAIEmbeddings=FakeEmbeddings)
+_module("langchain.vectorstores", FAISS=FakeFAISS)
+_module("langchain.text_splitter", RecursiveCharacterTextSplitter=FakeSplitter)
+
+for _name, _attrs in (("openai", {}), ("PyPDF2", {"PdfReader": None}), ("docx", {})):
+    if importlib.util.find_spec(_name) is None:
+        _module(_name, **_attrs)
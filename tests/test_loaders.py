@@ -0,0 +1,9 @@
+from loaders import chunk_documents
+
+
+def test_chunk_documents_splits_each_text():
+    assert chunk_documents(["aaa", "bbbb"], chunk_size=2) == ["aa", "a", "bb", "bb"]
+
+
+def test_chunk_documents_empty():
+    assert chunk_documents([]) == []
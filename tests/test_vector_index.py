@@ -0,0 +1,205 @@
+import io
+import os
+
+import pytest
+
+import vector_index
+from conftest import FakeEmbeddings, FakeFAISS
+
+
+class Upload(io.BytesIO):
+    """
+    Mimics a Streamlit UploadedFile holding a text document.
+    """
+    def __init__(self, name, text):
+        super().__init__(text.encode("utf-8"))
+        self.name = name
+        self.type = "text/plain"
+
+
+class FailingEmbeddings(FakeEmbeddings):
+    def embed_documents(self, texts):
+        raise RuntimeError("embedding service unavailable")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "compact_in_background", lambda *args, **kwargs: None)
+    monkeypatch.setattr(FakeFAISS, "on_save_base", None)
+    return str(tmp_path / "vectorstore")
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings()
+
+
+def loaded_texts(store, embeddings):
+    db = vector_index.load_vectorstore(embeddings, store)
+    return db.texts() if db else []
+
+
+def base_texts(store):
+    manifest = vector_index._read_manifest(store)
+    return FakeFAISS.load_local(os.path.join(store, manifest["base"]), None).texts()
+
+
+def segment_dirs(store):
+    return sorted(os.listdir(os.path.join(store, vector_index.SEGMENTS_DIR)))
+
+
+def test_reupload_is_skipped(store, embeddings):
+    assert vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store) == ["a.txt"]
+    assert vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store) == []
+    assert embeddings.embedded == 1
+    assert loaded_texts(store, embeddings) == ["alpha"]
+
+
+def test_manifest_stores_chunk_counts_not_ids(store, embeddings):
+    vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store)
+
+    (entry,) = vector_index.list_documents(store).values()
+    assert entry["chunks"] == 1
+    assert entry["id_prefix"] == entry["segment"]
+    assert "ids" not in entry
+
+
+def test_changed_file_replaces_previous_version(store, embeddings):
+    vector_index.sync_documents([Upload("reg.txt", "version one")], embeddings, store)
+    vector_index.sync_documents([Upload("reg.txt", "version two")], embeddings, store)
+
+    documents = vector_index.list_documents(store)
+    assert [entry["name"] for entry in documents.values()] == ["reg.txt"]
+    assert loaded_texts(store, embeddings) == ["version two"]
+    # The old version was never compacted, so nothing needs tombstoning
+    assert vector_index._read_manifest(store)["tombstones"] == {}
+
+
+def test_same_named_files_in_one_upload_are_both_kept(store, embeddings):
+    for _ in range(3):
+        files = [Upload("regulation.txt", "first folder"), Upload("regulation.txt", "second folder")]
+        vector_index.sync_documents(files, embeddings, store)
+
+    assert embeddings.embedded == 2
+    assert vector_index._read_manifest(store)["tombstones"] == {}
+    assert loaded_texts(store, embeddings) == ["first folder", "second folder"]
+
+
+def test_file_without_text_is_recorded(store, embeddings, monkeypatch):
+    calls = []
+    load_documents = vector_index.load_documents
+    monkeypatch.setattr(vector_index, "load_documents", lambda files: calls.append(files) or load_documents(files))
+
+    for _ in range(2):
+        assert vector_index.sync_documents([Upload("scan.txt", "")], embeddings, store) == []
+
+    assert len(calls) == 1
+    (entry,) = vector_index.list_documents(store).values()
+    assert entry == {"name": "scan.txt", "id_prefix": None, "chunks": 0, "segment": None}
+    assert vector_index.load_vectorstore(embeddings, store) is None
+
+
+def test_failed_build_removes_temp_segment(store, embeddings):
+    vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store)
+
+    with pytest.raises(RuntimeError):
+        vector_index.add_document(Upload("b.txt", "beta"), FailingEmbeddings(), store)
+
+    assert [name for name in segment_dirs(store) if name.startswith(".")] == []
+    assert [entry["name"] for entry in vector_index.list_documents(store).values()] == ["a.txt"]
+
+
+def test_prune_tombstones_and_compaction_removes_from_base(store, embeddings):
+    keep, drop = Upload("keep.txt", "keep"), Upload("drop.txt", "drop")
+    vector_index.sync_documents([keep, drop], embeddings, store)
+    vector_index.compact(embeddings, store)
+    assert base_texts(store) == ["drop", "keep"]
+
+    assert list(vector_index.stale_documents([keep], store)) == [vector_index.document_hash(drop)]
+    assert vector_index.prune_documents([keep], store) == [vector_index.document_hash(drop)]
+    assert vector_index._read_manifest(store)["tombstones"]
+    assert loaded_texts(store, embeddings) == ["keep"]
+
+    vector_index.compact(embeddings, store)
+    assert base_texts(store) == ["keep"]
+    assert vector_index._read_manifest(store)["tombstones"] == {}
+
+
+def test_prune_refuses_empty_upload(store, embeddings):
+    vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store)
+
+    with pytest.raises(ValueError):
+        vector_index.prune_documents([], store)
+    assert loaded_texts(store, embeddings) == ["alpha"]
+
+
+def test_changes_during_compaction_are_reconciled(store, embeddings):
+    a, b = Upload("a.txt", "alpha"), Upload("b.txt", "beta")
+    vector_index.sync_documents([a, b], embeddings, store)
+
+    def during_compaction(folder):
+        vector_index.add_document(Upload("c.txt", "gamma"), embeddings, store)
+        vector_index.remove_documents([vector_index.document_hash(a)], store)
+
+    FakeFAISS.on_save_base = during_compaction
+    vector_index.compact(embeddings, store)
+
+    manifest = vector_index._read_manifest(store)
+    assert base_texts(store) == ["alpha", "beta"]
+    assert manifest["tombstones"]
+    assert [e["name"] for e in manifest["documents"].values() if e["segment"]] == ["c.txt"]
+    assert loaded_texts(store, embeddings) == ["beta", "gamma"]
+
+    vector_index.compact(embeddings, store)
+    assert base_texts(store) == ["beta", "gamma"]
+    assert vector_index._read_manifest(store)["tombstones"] == {}
+
+
+def test_replaced_files_are_kept_for_one_compaction(store, embeddings):
+    vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store)
+    first_segments = segment_dirs(store)
+    vector_index.compact(embeddings, store)
+    first_base = vector_index._read_manifest(store)["base"]
+    assert segment_dirs(store) == first_segments
+
+    vector_index.sync_documents([Upload("b.txt", "beta")], embeddings, store)
+    second_segments = sorted(set(segment_dirs(store)) - set(first_segments))
+    vector_index.compact(embeddings, store)
+    assert os.path.isdir(os.path.join(store, first_base))
+    assert segment_dirs(store) == second_segments
+
+    vector_index.compact(embeddings, store)
+    assert not os.path.exists(os.path.join(store, first_base))
+    assert segment_dirs(store) == []
+
+
+def test_compaction_sweeps_leftover_folders(store, embeddings):
+    vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store)
+    os.makedirs(os.path.join(store, vector_index.SEGMENTS_DIR, ".abandoned"))
+    os.makedirs(os.path.join(store, "base-99"))
+
+    vector_index.compact(embeddings, store)
+
+    assert ".abandoned" not in segment_dirs(store)
+    assert not os.path.exists(os.path.join(store, "base-99"))
+
+
+def test_load_retries_when_snapshot_was_swept(store, embeddings, monkeypatch):
+    vector_index.sync_documents([Upload("a.txt", "alpha")], embeddings, store)
+    vector_index.compact(embeddings, store)
+    stale = vector_index._read_manifest(store)
+    for text in ("beta", "gamma"):
+        vector_index.sync_documents([Upload(f"{text}.txt", text)], embeddings, store)
+        vector_index.compact(embeddings, store)
+    assert not os.path.exists(os.path.join(store, stale["base"]))
+
+    read_manifest = vector_index._read_manifest
+    snapshots = [stale]
+    monkeypatch.setattr(vector_index, "_read_manifest", lambda path: snapshots.pop() if snapshots else read_manifest(path))
+
+    assert loaded_texts(store, embeddings) == ["alpha", "beta", "gamma"]
+
+
+def test_compact_on_empty_store(store, embeddings):
+    vector_index.compact(embeddings, store)
+    assert vector_index.load_vectorstore(embeddings, store) is None
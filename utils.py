@@ -1,29 +1,10 @@
 import pandas as pd
 import tempfile
-from PyPDF2 import PdfReader
-import docx
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.vectorstores import FAISS
 from langchain.llms import OpenAI
 from langchain.chains import ConversationalRetrievalChain
-
-def load_documents(files):
-    texts = []
-    for f in files:
-        if f.type == "application/pdf":
-            reader = PdfReader(f)
-            texts.extend(page.extract_text() for page in reader.pages)
-        elif f.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            doc = docx.Document(f)
-            texts.append("\n".join(p.text for p in doc.paragraphs))
-        else:  # txt
-            texts.append(f.read().decode("utf-8"))
-    return texts
-
-def chunk_documents(texts, chunk_size=1000, overlap=100):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
-    return splitter.split_texts(texts)
+from loaders import load_documents, chunk_documents
+from vector_index import load_vectorstore
 
 def generate_new_rules(chunks, prompt_template):
     llm = OpenAI(temperature=0)
@@ -55,7 +36,9 @@ def reconcile_rules(new_df, existing_df, prompt_template, batch_size=500):
 
 def conversational_qa(question, prompt_template):
     embeddings = OpenAIEmbeddings()
-    # Assumes FAISS index built elsewhere and saved
-    db = FAISS.load_local("vectorstore", embeddings)
+    # Index is maintained incrementally by vector_index.sync_documents
+    db = load_vectorstore(embeddings)
+    if db is None:
+        return "No documents have been indexed yet."
     qa = ConversationalRetrievalChain.from_llm(OpenAI(temperature=0), db.as_retriever())
     return qa({"question": question})["answer"]
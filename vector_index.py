@@ -0,0 +1,376 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from langchain.embeddings.openai import OpenAIEmbeddings
+from langchain.vectorstores import FAISS
+from config import VECTORSTORE_DIR
+from loaders import load_documents, chunk_documents
+
+EMBED_BATCH_SIZE = 64
+COMPACT_MIN_SEGMENTS = 8
+LOAD_RETRIES = 3
+MANIFEST_FILE = "manifest.json"
+SEGMENTS_DIR = "segments"
+
+# Guards manifest.json and the on-disk layout. Embedding and compaction
+# merges run outside it; only file renames and manifest swaps run inside.
+_lock = threading.Lock()
+# Serialises compactions so two never build the same base generation.
+_compaction_lock = threading.Lock()
+_compaction_thread = None
+# Temp segment folders currently being written, which compaction must not sweep.
+_building = set()
+
+# ------------------------------
+# Manifest Helpers
+# ------------------------------
+#
+# Layout under VECTORSTORE_DIR:
+#   manifest.json          live base index, tracked documents, tombstones
+#   base-<n>/              compacted FAISS index
+#   segments/<hash>-<id>/  FAISS index holding the chunks of one document
+#
+# New documents are written as their own segment, so indexing a document never
+# rewrites the rest of the corpus. Chunk ids are "<segment name>:<i>", so each
+# document only records its segment name and chunk count. Removing a document
+# that is still a segment just drops it; removing one already compacted into
+# the base tombstones its chunks until the background compaction rewrites the
+# base. Files replaced by a compaction are kept until the next one, so readers
+# holding the previous manifest can finish loading.
+
+def _empty_manifest():
+    return {"base": None, "generation": 0, "documents": {}, "tombstones": {}, "retired": []}
+
+def _read_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return _empty_manifest()
+    with open(manifest_path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+def _write_manifest(path, manifest):
+    """
+    Writes the manifest via a temp file so readers never see a partial file.
+    """
+    os.makedirs(path, exist_ok=True)
+    tmp_path = os.path.join(path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, separators=(",", ":"))
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+def _chunk_ids(id_prefix, chunks):
+    return [f"{id_prefix}:{i}" for i in range(chunks)]
+
+def document_hash(file):
+    """
+    Returns the SHA-256 of an uploaded file's contents.
+    """
+    if hasattr(file, "getvalue"):
+        data = file.getvalue()
+    else:
+        file.seek(0)
+        data = file.read()
+        file.seek(0)
+    return hashlib.sha256(data).hexdigest()
+
+# ------------------------------
+# Loading
+# ------------------------------
+
+def _load_index(folder, embeddings):
+    # faiss raises RuntimeError rather than FileNotFoundError for a missing
+    # index, so check up front to give retries a consistent signal.
+    if not os.path.isdir(folder):
+        raise FileNotFoundError(folder)
+    return FAISS.load_local(folder, embeddings)
+
+def _apply_tombstones(db, tombstones):
+    live = set(db.index_to_docstore_id.values())
+    dead = [chunk_id for prefix, chunks in tombstones.items() for chunk_id in _chunk_ids(prefix, chunks) if chunk_id in live]
+    if dead:
+        db.delete(dead)
+    return db
+
+def _load_manifest_indexes(manifest, embeddings, path, segments):
+    """
+    Loads the base index of a manifest snapshot, drops its tombstoned chunks
+    and merges in the given segments.
+    """
+    db = None
+    if manifest["base"]:
+        db = _load_index(os.path.join(path, manifest["base"]), embeddings)
+        db = _apply_tombstones(db, manifest["tombstones"])
+    for segment_name in segments:
+        segment = _load_index(os.path.join(path, SEGMENTS_DIR, segment_name), embeddings)
+        if db is None:
+            db = segment
+        else:
+            db.merge_from(segment)
+    return db
+
+def load_vectorstore(embeddings=None, path=VECTORSTORE_DIR):
+    """
+    Loads the base index, drops tombstoned chunks and merges in any segments
+    not yet compacted. Returns None if nothing has been indexed.
+    Only the manifest read holds the lock; if files from the snapshot have
+    been swept mid-load, the load restarts from a fresh manifest.
+    """
+    embeddings = embeddings or OpenAIEmbeddings()
+    for attempt in range(LOAD_RETRIES):
+        with _lock:
+            manifest = _read_manifest(path)
+        segments = [entry["segment"] for entry in manifest["documents"].values() if entry["segment"]]
+        try:
+            return _load_manifest_indexes(manifest, embeddings, path, segments)
+        except (FileNotFoundError, RuntimeError):
+            if attempt == LOAD_RETRIES - 1:
+                raise
+
+# ------------------------------
+# Indexing
+# ------------------------------
+
+def _build_segment(chunks, doc_hash, segment_name, name, embeddings, batch_size):
+    """
+    Embeds chunks in batches and accumulates them into a FAISS index.
+    Chunk ids are prefixed with the segment name so a document removed and
+    later re-uploaded never collides with its own tombstones.
+    """
+    db = None
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        vectors = embeddings.embed_documents(batch)
+        ids = [f"{segment_name}:{start + i}" for i in range(len(batch))]
+        metadatas = [{"source": name, "doc_hash": doc_hash, "chunk": start + i} for i in range(len(batch))]
+        if db is None:
+            db = FAISS.from_embeddings(list(zip(batch, vectors)), embeddings, metadatas=metadatas, ids=ids)
+        else:
+            db.add_embeddings(list(zip(batch, vectors)), metadatas=metadatas, ids=ids)
+    return db
+
+def _remove_document(manifest, doc_hash):
+    """
+    Drops a document from the manifest. Only chunks already compacted into
+    the base need a tombstone; a pending segment is simply unreferenced.
+    """
+    entry = manifest["documents"].pop(doc_hash)
+    if entry["segment"] is None and entry["chunks"]:
+        manifest["tombstones"][entry["id_prefix"]] = entry["chunks"]
+
+def _replace_same_name(manifest, name, keep):
+    """
+    Removes earlier versions of a file, except documents in keep (the
+    hashes of the current upload, which may hold several same-named files).
+    """
+    for old_hash, entry in list(manifest["documents"].items()):
+        if entry["name"] == name and old_hash not in keep:
+            _remove_document(manifest, old_hash)
+
+def add_document(file, embeddings=None, path=VECTORSTORE_DIR, batch_size=EMBED_BATCH_SIZE, keep=()):
+    """
+    Chunks, embeds and stores a single uploaded file as a new segment.
+    Skips files whose content is already indexed; a changed file with the
+    same name replaces the previous version unless that version's hash is
+    in keep. Files with no text are recorded without a segment so they are
+    not parsed again. Returns True if indexed.
+    """
+    doc_hash = document_hash(file)
+    keep = set(keep) | {doc_hash}
+    with _lock:
+        if doc_hash in _read_manifest(path)["documents"]:
+            return False
+
+    file.seek(0)
+    chunks = chunk_documents(load_documents([file]))
+    file.seek(0)
+
+    segment_name = None
+    segments_path = os.path.join(path, SEGMENTS_DIR)
+    if chunks:
+        embeddings = embeddings or OpenAIEmbeddings()
+        segment_name = f"{doc_hash}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(segments_path, "." + segment_name)
+        with _lock:
+            _building.add(segment_name)
+        try:
+            segment = _build_segment(chunks, doc_hash, segment_name, file.name, embeddings, batch_size)
+            segment.save_local(tmp_path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            with _lock:
+                _building.discard(segment_name)
+            raise
+
+    with _lock:
+        _building.discard(segment_name)
+        manifest = _read_manifest(path)
+        if doc_hash in manifest["documents"]:
+            if segment_name:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+        _replace_same_name(manifest, file.name, keep)
+        if segment_name:
+            os.replace(tmp_path, os.path.join(segments_path, segment_name))
+        manifest["documents"][doc_hash] = {
+            "name": file.name,
+            "id_prefix": segment_name,
+            "chunks": len(chunks),
+            "segment": segment_name,
+        }
+        _write_manifest(path, manifest)
+    return bool(chunks)
+
+def list_documents(path=VECTORSTORE_DIR):
+    """
+    Returns the indexed documents as {hash: {"name", "id_prefix", "chunks", "segment"}}.
+    """
+    with _lock:
+        return _read_manifest(path)["documents"]
+
+def remove_documents(doc_hashes, path=VECTORSTORE_DIR):
+    """
+    Removes the given documents from the index. Chunks already in the base
+    are dropped from disk by the next compaction.
+    """
+    with _lock:
+        manifest = _read_manifest(path)
+        removed = [h for h in doc_hashes if h in manifest["documents"]]
+        for doc_hash in removed:
+            _remove_document(manifest, doc_hash)
+        if removed:
+            _write_manifest(path, manifest)
+    return removed
+
+def stale_documents(files, path=VECTORSTORE_DIR):
+    """
+    Returns the indexed documents that are not among the given files.
+    """
+    uploaded = {document_hash(f) for f in files}
+    return {h: entry for h, entry in list_documents(path).items() if h not in uploaded}
+
+def prune_documents(files, path=VECTORSTORE_DIR):
+    """
+    Treats the given files as the full corpus and removes every indexed
+    document missing from them. Refuses an empty list, which would
+    otherwise wipe the whole index.
+    """
+    if not files:
+        raise ValueError("Refusing to prune the index against an empty upload")
+    return remove_documents(list(stale_documents(files, path)), path)
+
+def sync_documents(files, embeddings=None, path=VECTORSTORE_DIR):
+    """
+    Indexes any uploaded files not already in the store and schedules a
+    background compaction when segments or tombstones have accumulated.
+    Returns the names of the files that were indexed.
+    """
+    os.makedirs(os.path.join(path, SEGMENTS_DIR), exist_ok=True)
+    embeddings = embeddings or OpenAIEmbeddings()
+
+    uploaded = {document_hash(f) for f in files}
+    added = [f.name for f in files if add_document(f, embeddings, path, keep=uploaded)]
+    maybe_compact(embeddings, path)
+    return added
+
+# ------------------------------
+# Compaction
+# ------------------------------
+
+def compact(embeddings=None, path=VECTORSTORE_DIR):
+    """
+    Folds pending segments into a new base index and drops tombstoned
+    chunks. The merge works on a snapshot; documents indexed or removed
+    meanwhile are reconciled when the new manifest is written. Concurrent
+    calls run one after another.
+    """
+    with _compaction_lock:
+        _compact(embeddings or OpenAIEmbeddings(), path)
+
+def _compact(embeddings, path):
+    with _lock:
+        snapshot = _read_manifest(path)
+
+    merged = {h: entry["segment"] for h, entry in snapshot["documents"].items() if entry["segment"]}
+    db = _load_manifest_indexes(snapshot, embeddings, path, merged.values())
+
+    generation = snapshot["generation"] + 1
+    base_name = None
+    live = set()
+    if db is not None:
+        base_name = f"base-{generation}"
+        base_path = os.path.join(path, base_name)
+        shutil.rmtree(base_path, ignore_errors=True)
+        db.save_local(base_path)
+        live = set(db.index_to_docstore_id.values())
+
+    with _lock:
+        manifest = _read_manifest(path)
+        old_base = manifest["base"]
+        for doc_hash, segment_name in merged.items():
+            entry = manifest["documents"].get(doc_hash)
+            if entry is not None and entry["segment"] == segment_name:
+                entry["segment"] = None
+            else:
+                # Removed while we merged it: its chunks are now in the new base
+                manifest["tombstones"][segment_name] = snapshot["documents"][doc_hash]["chunks"]
+        manifest["tombstones"] = {
+            prefix: chunks for prefix, chunks in manifest["tombstones"].items() if f"{prefix}:0" in live
+        }
+        manifest["base"] = base_name
+        manifest["generation"] = generation
+        manifest["retired"] = [name for name in [old_base] if name and name != base_name]
+        manifest["retired"] += [os.path.join(SEGMENTS_DIR, name) for name in merged.values()]
+        _write_manifest(path, manifest)
+        _sweep(path, manifest)
+
+def _sweep(path, manifest):
+    """
+    Deletes base and segment folders that neither the manifest nor the
+    previous compaction's readers can reference, plus temp segment folders
+    left behind by failed writes. Called with _lock held.
+    """
+    keep = set(manifest["retired"])
+    if manifest["base"]:
+        keep.add(manifest["base"])
+    keep.update(os.path.join(SEGMENTS_DIR, e["segment"]) for e in manifest["documents"].values() if e["segment"])
+
+    for name in os.listdir(path):
+        if name.startswith("base-") and name not in keep:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    segments_path = os.path.join(path, SEGMENTS_DIR)
+    if not os.path.isdir(segments_path):
+        return
+    for name in os.listdir(segments_path):
+        if name.startswith("."):
+            stale = name[1:] not in _building
+        else:
+            stale = os.path.join(SEGMENTS_DIR, name) not in keep
+        if stale:
+            shutil.rmtree(os.path.join(segments_path, name), ignore_errors=True)
+
+def maybe_compact(embeddings=None, path=VECTORSTORE_DIR):
+    """
+    Starts a background compaction once enough segments have accumulated or
+    compacted chunks have been removed.
+    """
+    with _lock:
+        manifest = _read_manifest(path)
+    pending = sum(1 for entry in manifest["documents"].values() if entry["segment"])
+    if pending >= COMPACT_MIN_SEGMENTS or manifest["tombstones"]:
+        compact_in_background(embeddings, path)
+
+def compact_in_background(embeddings=None, path=VECTORSTORE_DIR):
+    """
+    Starts compact() on a daemon thread unless one is already running.
+    """
+    global _compaction_thread
+    with _lock:
+        if _compaction_lock.locked() or (_compaction_thread is not None and _compaction_thread.is_alive()):
+            return _compaction_thread
+        _compaction_thread = threading.Thread(target=compact, args=(embeddings, path), daemon=True)
+        _compaction_thread.start()
+    return _compaction_thread